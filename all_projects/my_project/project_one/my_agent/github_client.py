@@ -6,13 +6,31 @@ metadata and posting comments. All API calls require GITHUB_TOKEN env var.
 
 Environment Variables:
     GITHUB_TOKEN: Personal Access Token with 'repo' scope.
+    CI_BOSS_CACHE_DIR: (Optional) Directory for persisting the ETag and
+        PR files caches.
 """
 
 import os
+import hashlib
+import json
+import shelve
 import logging
-from typing import Optional, List, Dict, Any, TYPE_CHECKING
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Callable, Tuple, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # Optional: orjson parses API responses several times faster
+    import orjson
+except ImportError:
+    orjson = None
 
 if TYPE_CHECKING:
     from .graph import CIState
@@ -21,14 +39,177 @@ logger = logging.getLogger(__name__)
 
 # GitHub API base URL
 GITHUB_API_BASE = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_BASE}/graphql"
 
 # Maximum length for log snippets in comments
 MAX_LOG_SNIPPET_LENGTH = 2000
 
+# Layout of the CI results comment. Optional sections are rendered from
+# their own templates (each starting with a blank line) or left empty.
+_STATUS_HEADINGS = {
+    "passed": ("✅", "Tests Passed"),
+    "failed": ("❌", "Tests Failed"),
+    "pending": ("⏳", "Tests Pending"),
+}
+_TRUNCATED_SUFFIX = "\n... (truncated)"
+_CI_COMMENT_TEMPLATE = (
+    "## {status_emoji} CI Boss Report: {status_text}\n"
+    "\n"
+    "**Commit:** `{short_sha}`"
+    "{summary_section}{linear_section}{logs_section}{files_section}\n"
+    "\n"
+    "---\n"
+    "_Generated by CI Boss Agent_"
+)
+_SUMMARY_SECTION = "\n\n### Summary\n{summary}"
+_LINEAR_SECTION = "\n\n📋 **Linked Linear Issue:** [{text}]({url})"
+_LOGS_SECTION = (
+    "\n\n<details>\n"
+    "<summary>Test Logs (click to expand)</summary>\n"
+    "\n"
+    "```\n"
+    "{logs}\n"
+    "```\n"
+    "\n"
+    "</details>"
+)
+_FILES_SECTION = "\n\n**Changed Files:** {total} file(s){preview_note}\n{file_lines}"
+_FILES_PREVIEW_NOTE = "\n  (showing first 10 of {total})"
+
+# JSON decoder for response bodies (accepts bytes)
+_loads = orjson.loads if orjson else json.loads
+
+# Upper bound on simultaneous connections to api.github.com; concurrent
+# fetches (e.g. PR file pages) are sized to match.
+MAX_CONNECTIONS = 8
+
+# (connect, read) timeouts in seconds: fail fast when the TCP/TLS handshake
+# stalls, while still tolerating slow responses from the API.
+GITHUB_TIMEOUT = (3.05, 27)
+
+# Shared session so every call reuses pooled keep-alive connections to
+# api.github.com instead of paying a fresh TCP + TLS handshake per request.
+# The pool blocks when all connections are busy, so bursts wait for a warm
+# connection rather than opening extra ones that are discarded afterwards.
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28",
+})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=MAX_CONNECTIONS,
+        pool_block=True,
+        # Transient gateway errors only: rate limiting (403/429 with
+        # Retry-After) is handled by _send, which caps the wait
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            respect_retry_after_header=False,
+        ),
+    ),
+)
+
+# Longest we are willing to sleep before one request, whether GitHub asked
+# for it (Retry-After) or the rate limiter is spacing out a low budget
+_MAX_RETRY_AFTER = 60
+
+
+class _RateLimiter:
+    """Client-side throttle driven by GitHub's rate-limit response headers.
+    
+    Tracks X-RateLimit-Remaining / X-RateLimit-Reset per rate-limit resource
+    (REST "core" and "graphql" are separate budgets). Once a budget drops
+    below the threshold, requests are spaced so the remainder lasts until
+    the window resets, instead of bursting into a 403. No single wait is
+    longer than _MAX_RETRY_AFTER.
+    """
+    
+    def __init__(self, threshold: int = 50):
+        self.threshold = threshold
+        self._budgets: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, resource: str = "core") -> None:
+        """Sleep before a request if the resource's budget is running low."""
+        with self._lock:
+            budget = self._budgets.get(resource)
+        if budget is None:
+            return
+        remaining, reset_at = budget
+        if remaining >= self.threshold:
+            return
+        delay = min(max(0.0, reset_at - time.time()) / max(remaining, 1), _MAX_RETRY_AFTER)
+        if delay > 0:
+            logger.info(
+                f"GitHub {resource} rate limit low ({remaining} left), "
+                f"waiting {delay:.1f}s"
+            )
+            time.sleep(delay)
+    
+    def update(self, response: requests.Response) -> None:
+        """Record the budget reported by a response's headers."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            budget = (int(remaining), float(reset))
+        except ValueError:
+            return
+        resource = response.headers.get("X-RateLimit-Resource", "core")
+        with self._lock:
+            self._budgets[resource] = budget
+
+
+_RATE_LIMITER = _RateLimiter()
+
+
+def _send(
+    send: Callable[..., requests.Response],
+    url: str,
+    **kwargs: Any
+) -> requests.Response:
+    """Send a request through the rate limiter.
+    
+    If GitHub answers 403/429 with a Retry-After header (secondary rate
+    limits), sleeps for that long and retries once.
+    
+    Args:
+        send: Session method to call, e.g. _SESSION.get.
+        url: Full API URL.
+        **kwargs: Passed through to the session method.
+        
+    Returns:
+        The final response.
+    """
+    resource = "graphql" if url == GITHUB_GRAPHQL_URL else "core"
+    _RATE_LIMITER.wait(resource)
+    response = send(url, **kwargs)
+    _RATE_LIMITER.update(response)
+    
+    retry_after = response.headers.get("Retry-After")
+    if response.status_code in (403, 429) and retry_after and retry_after.isdigit():
+        delay = int(retry_after)
+        if delay <= _MAX_RETRY_AFTER:
+            logger.warning(f"GitHub rate limited the request, retrying in {delay}s")
+            time.sleep(delay)
+            response = send(url, **kwargs)
+            _RATE_LIMITER.update(response)
+    
+    return response
+
 
+@lru_cache(maxsize=1)
 def _get_github_token() -> Optional[str]:
     """Get GitHub token from environment.
     
+    The environment is read (and the missing-token warning logged) once per
+    process; call _get_github_token.cache_clear() after changing GITHUB_TOKEN.
+    
     Returns:
         The GitHub token if set, None otherwise.
     """
@@ -41,8 +222,13 @@ def _get_github_token() -> Optional[str]:
     return token
 
 
+@lru_cache(maxsize=4)
 def _get_headers(token: str) -> Dict[str, str]:
-    """Build headers for GitHub API requests.
+    """Build per-token headers for GitHub API requests.
+    
+    The Accept and API version headers are set once on the shared session;
+    only the Authorization header varies per token. The result is cached,
+    so callers must not mutate the returned dict.
     
     Args:
         token: GitHub Personal Access Token.
@@ -50,13 +236,10 @@ def _get_headers(token: str) -> Dict[str, str]:
     Returns:
         Headers dict for requests.
     """
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
+    return {"Authorization": f"Bearer {token}"}
 
 
+@lru_cache(maxsize=32)
 def _parse_repo(repo: str) -> tuple[str, str]:
     """Parse owner/repo string into components.
     
@@ -75,6 +258,147 @@ def _parse_repo(repo: str) -> tuple[str, str]:
     return parts[0], parts[1]
 
 
+class _PersistentCache:
+    """Thread-safe LRU cache, written through to disk when configured.
+    
+    At most max_entries are kept in memory; the least recently used entry
+    is evicted first. If CI_BOSS_CACHE_DIR is set, entries are also stored
+    in a shelve file named after the cache in that directory, so they
+    survive across CI invocations. The file is capped at the same size by
+    dropping the oldest writes. Disk errors are logged and otherwise
+    ignored.
+    """
+    
+    def __init__(self, name: str, max_entries: int = 512):
+        self.name = name
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _path(self) -> Optional[str]:
+        cache_dir = os.environ.get("CI_BOSS_CACHE_DIR")
+        if not cache_dir:
+            return None
+        os.makedirs(cache_dir, exist_ok=True)
+        return os.path.join(cache_dir, self.name)
+    
+    def _remember(self, key: str, value: Any) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entries."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def get(self, key: str) -> Any:
+        """Look up an entry, in memory first, then on disk."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            try:
+                path = self._path()
+                if path:
+                    with shelve.open(path) as store:
+                        stored = store.get(key)
+                    if stored is not None:
+                        entry = stored[1]  # (written_at, value)
+            except Exception as e:
+                logger.warning(f"Could not read {self.name} cache: {e}")
+                return None
+            if entry is not None:
+                self._remember(key, entry)
+            return entry
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store an entry in memory and, if configured, on disk."""
+        with self._lock:
+            self._remember(key, value)
+            try:
+                path = self._path()
+                if path:
+                    with shelve.open(path) as store:
+                        store[key] = (time.time(), value)
+                        if len(store) > self.max_entries:
+                            # Prune to three quarters so the scan is rare
+                            keep = self.max_entries * 3 // 4
+                            oldest = sorted(store.keys(), key=lambda k: store[k][0])
+                            for stale in oldest[:len(oldest) - keep]:
+                                del store[stale]
+            except Exception as e:
+                logger.warning(f"Could not write {self.name} cache: {e}")
+    
+    def clear(self) -> None:
+        """Drop all in-memory entries."""
+        with self._lock:
+            self._memory.clear()
+
+
+# ETag cache for conditional GETs: cache key -> (ETag, trimmed body).
+# GitHub answers a matching If-None-Match with 304, which costs no primary
+# rate limit and no body. Bodies are trimmed to the fields callers read, so
+# file patches are never cached.
+_ETAG_CACHE = _PersistentCache("github_etags")
+
+# Changed files per PR head commit: "repo#pr@sha" -> (stored_at, files)
+_PR_FILES_CACHE = _PersistentCache("github_pr_files")
+_PR_FILES_TTL = 3600  # seconds
+
+
+def _commit_fields(commit: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the parts of a commit payload callers use (no file patches)."""
+    return {
+        "sha": commit.get("sha"),
+        "commit": {"message": (commit.get("commit") or {}).get("message", "")},
+        "files": [{"filename": f["filename"]} for f in commit.get("files") or []],
+    }
+
+
+def _file_names(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep only the filename of each entry in a PR files page."""
+    return [{"filename": f["filename"]} for f in files]
+
+
+def _conditional_get(
+    url: str,
+    token: str,
+    params: Optional[Dict[str, Any]] = None,
+    trim: Optional[Callable[[Any], Any]] = None
+) -> Tuple[requests.Response, Any]:
+    """GET a GitHub API resource, revalidating any cached copy by ETag.
+    
+    Args:
+        url: Full API URL.
+        token: GitHub token.
+        params: Optional query parameters.
+        trim: Optional function reducing the parsed body to the fields the
+            caller needs. Only the cached copy is trimmed.
+        
+    Returns:
+        Tuple of (response, parsed body). A 200 returns the full body; on a
+        304 the body comes from the cache (trimmed, if trim was given). The
+        body is None if the request did not succeed.
+    """
+    key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+    cached = _ETAG_CACHE.get(key)
+    
+    headers = _get_headers(token)
+    if cached:
+        headers = {**headers, "If-None-Match": cached[0]}
+    
+    response = _send(_SESSION.get, url, headers=headers, params=params, timeout=GITHUB_TIMEOUT)
+    
+    if response.status_code == 304 and cached:
+        return response, cached[1]
+    if response.status_code == 200:
+        body = _loads(response.content)
+        etag = response.headers.get("ETag")
+        if etag:
+            _ETAG_CACHE.set(key, (etag, trim(body) if trim else body))
+        return response, body
+    return response, None
+
+
 def fetch_pr_details(repo: str, pr_number: int, token: str) -> Optional[Dict[str, Any]]:
     """Fetch pull request details from GitHub.
     
@@ -90,10 +414,10 @@ def fetch_pr_details(repo: str, pr_number: int, token: str) -> Optional[Dict[str
         owner, repo_name = _parse_repo(repo)
         url = f"{GITHUB_API_BASE}/repos/{owner}/{repo_name}/pulls/{pr_number}"
         
-        response = requests.get(url, headers=_get_headers(token), timeout=30)
+        response, data = _conditional_get(url, token)
         
-        if response.status_code == 200:
-            return response.json()
+        if data is not None:
+            return data
         else:
             logger.error(
                 f"Failed to fetch PR #{pr_number} from {repo}: "
@@ -109,9 +433,54 @@ def fetch_pr_details(repo: str, pr_number: int, token: str) -> Optional[Dict[str
         return None
 
 
-def fetch_pr_files(repo: str, pr_number: int, token: str) -> Optional[List[str]]:
+def _last_page_number(response: requests.Response) -> Optional[int]:
+    """Get the page number of the Link header's rel="last" URL, if present."""
+    last_url = response.links.get("last", {}).get("url")
+    if not last_url:
+        return None
+    page = parse_qs(urlparse(last_url).query).get("page")
+    return int(page[0]) if page and page[0].isdigit() else None
+
+
+def fetch_pr_files(
+    repo: str,
+    pr_number: int,
+    token: str,
+    head_sha: Optional[str] = None
+) -> Optional[List[str]]:
     """Fetch list of changed files in a pull request.
     
+    When the PR's head commit is known, the listing is cached for an hour
+    under (repo, pr_number, head_sha), so re-running the graph against the
+    same commit does not download it again. head_sha must be the head
+    GitHub reports for the PR (a new push changes the key); any other SHA
+    could serve a stale listing.
+    
+    Args:
+        repo: Repository in "owner/repo" format.
+        pr_number: Pull request number.
+        token: GitHub token.
+        head_sha: PR head commit SHA as reported by GitHub, enabling the
+            cache when given.
+        
+    Returns:
+        List of changed file paths or None if request fails.
+    """
+    cache_key = f"{repo}#{pr_number}@{head_sha}"
+    if head_sha:
+        cached = _PR_FILES_CACHE.get(cache_key)
+        if cached and time.time() - cached[0] < _PR_FILES_TTL:
+            return list(cached[1])
+    
+    files = _fetch_pr_files_uncached(repo, pr_number, token)
+    if head_sha and files is not None:
+        _PR_FILES_CACHE.set(cache_key, (time.time(), files))
+    return files
+
+
+def _fetch_pr_files_uncached(repo: str, pr_number: int, token: str) -> Optional[List[str]]:
+    """Fetch list of changed files in a pull request from the API.
+    
     Args:
         repo: Repository in "owner/repo" format.
         pr_number: Pull request number.
@@ -125,31 +494,54 @@ def fetch_pr_files(repo: str, pr_number: int, token: str) -> Optional[List[str]]
         url = f"{GITHUB_API_BASE}/repos/{owner}/{repo_name}/pulls/{pr_number}/files"
         
         # Paginate through all files (up to a reasonable limit)
-        all_files: List[str] = []
-        page = 1
         per_page = 100
+        max_pages = 10  # Max 1000 files
         
-        while page <= 10:  # Max 1000 files
-            params = {"page": page, "per_page": per_page}
-            response = requests.get(
-                url, headers=_get_headers(token), params=params, timeout=30
+        def fetch_page(page: int) -> Tuple[requests.Response, Any]:
+            return _conditional_get(
+                url, token, {"page": page, "per_page": per_page}, trim=_file_names
             )
-            
-            if response.status_code == 200:
-                files_data = response.json()
-                if not files_data:
-                    break
+        
+        def failed(response: requests.Response) -> None:
+            logger.error(
+                f"Failed to fetch files for PR #{pr_number}: "
+                f"HTTP {response.status_code} - {response.text[:200]}"
+            )
+        
+        response, files_data = fetch_page(1)
+        if files_data is None:
+            failed(response)
+            return None
+        
+        all_files: List[str] = [f["filename"] for f in files_data]
+        if len(files_data) < per_page:
+            return all_files
+        
+        last_page = _last_page_number(response)
+        if last_page:
+            # Page 1 told us how many pages remain, so fetch them all at once
+            pages = range(2, min(last_page, max_pages) + 1)
+            with ThreadPoolExecutor(max_workers=MAX_CONNECTIONS) as executor:
+                results = list(executor.map(fetch_page, pages))
+            for response, files_data in results:
+                if files_data is None:
+                    failed(response)
+                    return None
                 all_files.extend([f["filename"] for f in files_data])
-                if len(files_data) < per_page:
-                    break
-                page += 1
-            else:
-                logger.error(
-                    f"Failed to fetch files for PR #{pr_number}: "
-                    f"HTTP {response.status_code} - {response.text[:200]}"
-                )
+            return all_files
+        
+        # No Link header (e.g. a 304 revalidation): walk pages sequentially
+        page = 2
+        while page <= max_pages:
+            response, files_data = fetch_page(page)
+            if files_data is None:
+                failed(response)
                 return None
-                
+            all_files.extend([f["filename"] for f in files_data])
+            if len(files_data) < per_page:
+                break
+            page += 1
+        
         return all_files
         
     except requests.RequestException as e:
@@ -160,8 +552,11 @@ def fetch_pr_files(repo: str, pr_number: int, token: str) -> Optional[List[str]]
         return None
 
 
-def fetch_commit_files(repo: str, commit_sha: str, token: str) -> Optional[List[str]]:
-    """Fetch list of changed files in a commit.
+def fetch_commit(repo: str, commit_sha: str, token: str) -> Optional[Dict[str, Any]]:
+    """Fetch a commit from GitHub, including its message and changed files.
+    
+    One GET of the commit endpoint returns both, so callers that need the
+    files and the message should derive them from this single response.
     
     Args:
         repo: Repository in "owner/repo" format.
@@ -169,18 +564,19 @@ def fetch_commit_files(repo: str, commit_sha: str, token: str) -> Optional[List[
         token: GitHub token.
         
     Returns:
-        List of changed file paths or None if request fails.
+        Commit dict (with "commit" and "files" keys) or None if request
+        fails. A fresh response is the full commit JSON; when GitHub answers
+        304 and the cached copy is used, it holds only "sha", the commit
+        message and file names (no patches).
     """
     try:
         owner, repo_name = _parse_repo(repo)
         url = f"{GITHUB_API_BASE}/repos/{owner}/{repo_name}/commits/{commit_sha}"
         
-        response = requests.get(url, headers=_get_headers(token), timeout=30)
+        response, data = _conditional_get(url, token, trim=_commit_fields)
         
-        if response.status_code == 200:
-            data = response.json()
-            files = data.get("files", [])
-            return [f["filename"] for f in files]
+        if data is not None:
+            return data
         else:
             logger.error(
                 f"Failed to fetch commit {commit_sha}: "
@@ -196,37 +592,150 @@ def fetch_commit_files(repo: str, commit_sha: str, token: str) -> Optional[List[
         return None
 
 
+def fetch_commit_files(repo: str, commit_sha: str, token: str) -> Optional[List[str]]:
+    """Fetch list of changed files in a commit.
+    
+    Args:
+        repo: Repository in "owner/repo" format.
+        commit_sha: Commit SHA.
+        token: GitHub token.
+        
+    Returns:
+        List of changed file paths or None if request fails.
+    """
+    data = fetch_commit(repo, commit_sha, token)
+    if data is None:
+        return None
+    return [f["filename"] for f in data.get("files", [])]
+
+
 def fetch_commit_details(repo: str, commit_sha: str, token: str) -> Optional[Dict[str, Any]]:
     """Fetch commit details from GitHub.
     
+    Equivalent to fetch_commit; kept for existing callers.
+    
     Args:
         repo: Repository in "owner/repo" format.
         commit_sha: Commit SHA.
         token: GitHub token.
         
     Returns:
-        Commit details dict or None if request fails.
+        Commit details dict or None if request fails. As with fetch_commit,
+        a commit served from the ETag cache (HTTP 304) holds only "sha",
+        the commit message and file names, not the full payload.
+    """
+    return fetch_commit(repo, commit_sha, token)
+
+
+# Head SHA, changed files and head commit message in a single query
+_PR_BUNDLE_QUERY = """
+query PullRequestBundle($owner: String!, $name: String!, $n: Int!, $cursor: String) {
+    repository(owner: $owner, name: $name) {
+        pullRequest(number: $n) {
+            headRefOid
+            files(first: 100, after: $cursor) {
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+                nodes {
+                    path
+                }
+            }
+            commits(last: 1) {
+                nodes {
+                    commit {
+                        message
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+
+def fetch_pr_bundle_graphql(
+    repo: str,
+    pr_number: int,
+    token: str
+) -> Optional[Dict[str, Any]]:
+    """Fetch PR head SHA, changed files and head commit message via GraphQL.
+    
+    Replaces the REST fan-out (PR details, PR files, commit details) with
+    one request for PRs with up to 100 files. Larger PRs are paged with the
+    files cursor, up to the same 1000-file limit as fetch_pr_files.
+    
+    Args:
+        repo: Repository in "owner/repo" format.
+        pr_number: Pull request number.
+        token: GitHub token.
+        
+    Returns:
+        Dict with "head_sha", "changed_files" and "commit_message" keys,
+        or None if the request fails.
     """
     try:
         owner, repo_name = _parse_repo(repo)
-        url = f"{GITHUB_API_BASE}/repos/{owner}/{repo_name}/commits/{commit_sha}"
+        variables: Dict[str, Any] = {
+            "owner": owner,
+            "name": repo_name,
+            "n": pr_number,
+            "cursor": None,
+        }
         
-        response = requests.get(url, headers=_get_headers(token), timeout=30)
+        bundle: Dict[str, Any] = {
+            "head_sha": None,
+            "changed_files": [],
+            "commit_message": None,
+        }
         
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.error(
-                f"Failed to fetch commit {commit_sha}: "
-                f"HTTP {response.status_code} - {response.text[:200]}"
+        for _ in range(10):  # Max 1000 files
+            response = _send(
+                _SESSION.post,
+                GITHUB_GRAPHQL_URL,
+                headers=_get_headers(token),
+                json={"query": _PR_BUNDLE_QUERY, "variables": variables},
+                timeout=GITHUB_TIMEOUT
             )
-            return None
             
+            if response.status_code != 200:
+                logger.error(
+                    f"GraphQL request for PR #{pr_number} failed: "
+                    f"HTTP {response.status_code} - {response.text[:200]}"
+                )
+                return None
+            
+            data = _loads(response.content)
+            if data.get("errors"):
+                logger.error(f"GitHub GraphQL errors: {data['errors']}")
+                return None
+            
+            pull_request = ((data.get("data") or {}).get("repository") or {}).get("pullRequest")
+            if not pull_request:
+                logger.error(f"PR #{pr_number} not found in {repo} via GraphQL")
+                return None
+            
+            bundle["head_sha"] = pull_request.get("headRefOid")
+            commits = (pull_request.get("commits") or {}).get("nodes") or []
+            if commits:
+                bundle["commit_message"] = commits[-1]["commit"]["message"]
+            
+            files = pull_request.get("files") or {}
+            bundle["changed_files"].extend(f["path"] for f in files.get("nodes") or [])
+            
+            page_info = files.get("pageInfo") or {}
+            if not page_info.get("hasNextPage"):
+                break
+            variables["cursor"] = page_info.get("endCursor")
+        
+        return bundle
+        
     except requests.RequestException as e:
-        logger.error(f"Request error fetching commit: {e}")
+        logger.error(f"Request error fetching PR via GraphQL: {e}")
         return None
     except ValueError as e:
-        logger.error(f"Error parsing repo: {e}")
+        logger.error(f"Error parsing GraphQL response: {e}")
         return None
 
 
@@ -252,11 +761,12 @@ def post_pr_comment(
         # Use issues endpoint for PR comments
         url = f"{GITHUB_API_BASE}/repos/{owner}/{repo_name}/issues/{pr_number}/comments"
         
-        response = requests.post(
+        response = _send(
+            _SESSION.post,
             url,
             headers=_get_headers(token),
             json={"body": body},
-            timeout=30
+            timeout=GITHUB_TIMEOUT
         )
         
         if response.status_code in (200, 201):
@@ -280,6 +790,9 @@ def post_pr_comment(
 def build_ci_comment(state: "CIState") -> str:
     """Build a formatted CI comment for a PR.
     
+    The layout lives in module-level templates; this function only
+    computes their values.
+    
     Args:
         state: Current CI state.
         
@@ -288,93 +801,97 @@ def build_ci_comment(state: "CIState") -> str:
     """
     # Status emoji
     test_status = state.get("test_status", "pending")
-    if test_status == "passed":
-        status_emoji = "✅"
-        status_text = "Tests Passed"
-    elif test_status == "failed":
-        status_emoji = "❌"
-        status_text = "Tests Failed"
-    else:
-        status_emoji = "⏳"
-        status_text = "Tests Pending"
-    
-    # Build comment
-    lines = [
-        f"## {status_emoji} CI Boss Report: {status_text}",
-        "",
-        f"**Commit:** `{state.get('commit_sha', 'N/A')[:8]}`",
-    ]
+    status_emoji, status_text = _STATUS_HEADINGS.get(
+        test_status, _STATUS_HEADINGS["pending"]
+    )
     
     # Add summary if available
     summary = state.get("summary")
-    if summary:
-        lines.extend([
-            "",
-            "### Summary",
-            summary,
-        ])
+    summary_section = _SUMMARY_SECTION.format(summary=summary) if summary else ""
     
     # Add Linear issue link if available
     linear_url = state.get("linear_issue_url")
-    linear_id = state.get("linear_issue_identifier")
+    linear_section = ""
     if linear_url:
-        linear_text = linear_id if linear_id else "Linear Issue"
-        lines.extend([
-            "",
-            f"📋 **Linked Linear Issue:** [{linear_text}]({linear_url})",
-        ])
+        linear_section = _LINEAR_SECTION.format(
+            text=state.get("linear_issue_identifier") or "Linear Issue",
+            url=linear_url,
+        )
     
     # Add truncated test logs if available and tests failed
     test_logs = state.get("test_logs")
+    logs_section = ""
     if test_logs and test_status == "failed":
         truncated_logs = test_logs[:MAX_LOG_SNIPPET_LENGTH]
         if len(test_logs) > MAX_LOG_SNIPPET_LENGTH:
-            truncated_logs += "\n... (truncated)"
-        lines.extend([
-            "",
-            "<details>",
-            "<summary>Test Logs (click to expand)</summary>",
-            "",
-            "```",
-            truncated_logs,
-            "```",
-            "",
-            "</details>",
-        ])
+            truncated_logs += _TRUNCATED_SUFFIX
+        logs_section = _LOGS_SECTION.format(logs=truncated_logs)
     
     # Add changed files summary
     changed_files = state.get("changed_files", [])
+    files_section = ""
     if changed_files:
-        files_preview = changed_files[:10]
-        lines.extend([
-            "",
-            f"**Changed Files:** {len(changed_files)} file(s)",
-        ])
-        if len(changed_files) > 10:
-            lines.append(f"  (showing first 10 of {len(changed_files)})")
-        for f in files_preview:
-            lines.append(f"  - `{f}`")
+        total = len(changed_files)
+        files_section = _FILES_SECTION.format(
+            total=total,
+            preview_note=_FILES_PREVIEW_NOTE.format(total=total) if total > 10 else "",
+            file_lines="\n".join([f"  - `{f}`" for f in changed_files[:10]]),
+        )
     
-    lines.extend([
-        "",
-        "---",
-        "_Generated by CI Boss Agent_",
-    ])
+    return _CI_COMMENT_TEMPLATE.format(
+        status_emoji=status_emoji,
+        status_text=status_text,
+        short_sha=state.get("commit_sha", "N/A")[:8],
+        summary_section=summary_section,
+        linear_section=linear_section,
+        logs_section=logs_section,
+        files_section=files_section,
+    )
+
+
+# Digest of the last comment posted per (repo, PR number), so the planner
+# loop does not repost an identical report.
+_last_posted: Dict[Tuple[str, int], str] = {}
+
+
+def _comment_digest(state: "CIState") -> str:
+    """Hash the state fields that build_ci_comment renders.
     
-    return "\n".join(lines)
+    Args:
+        state: Current CI state.
+        
+    Returns:
+        Hex digest identifying the comment content.
+    """
+    changed_files = state.get("changed_files") or []
+    test_logs = state.get("test_logs") or ""
+    key = (
+        state.get("test_status", "pending"),
+        state.get("commit_sha"),
+        state.get("summary"),
+        state.get("linear_issue_url"),
+        state.get("linear_issue_identifier"),
+        len(changed_files),
+        tuple(changed_files[:10]),
+        len(test_logs),
+        test_logs[:MAX_LOG_SNIPPET_LENGTH],
+    )
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
 
 
 def post_ci_results_comment(state: "CIState") -> bool:
     """Post CI results as a comment on the PR.
     
     This is a convenience function that builds and posts the comment.
-    Silently skips if PR number is not set or token is missing.
+    Silently skips if PR number is not set or token is missing. If the
+    same report was already posted to this PR, nothing is rebuilt or sent.
     
     Args:
         state: Current CI state.
         
     Returns:
-        True if comment was posted, False otherwise (including when skipped).
+        True if comment was posted (or an identical one already was),
+        False otherwise (including when skipped).
     """
     # Check prerequisites
     pr_number = state.get("pr_number")
@@ -392,6 +909,14 @@ def post_ci_results_comment(state: "CIState") -> bool:
     if not token:
         return False
     
+    digest = _comment_digest(state)
+    if _last_posted.get((repo, pr_number)) == digest:
+        logger.info(f"CI report unchanged, not reposting to PR #{pr_number}")
+        return True
+    
     # Build and post comment
     body = build_ci_comment(state)
-    return post_pr_comment(repo, pr_number, body, token)
+    posted = post_pr_comment(repo, pr_number, body, token)
+    if posted:
+        _last_posted[(repo, pr_number)] = digest
+    return posted
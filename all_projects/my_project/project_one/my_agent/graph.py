@@ -11,6 +11,7 @@ This agent coordinates CI/CD workflows by:
 
 Environment Variables:
     GITHUB_TOKEN: Personal Access Token with 'repo' scope
+    CI_BOSS_CACHE_DIR: (Optional) Directory for caches persisted across runs
     PLAYWRIGHT_COMMAND: Command to run tests (default: "npx playwright test")
     PLAYWRIGHT_WORKING_DIR: Directory to run tests from
     LINEAR_API_KEY: Personal API key for Linear
@@ -20,13 +21,17 @@ Environment Variables:
     OPENAI_API_KEY: Required for the planner LLM
 """
 
-from typing import TypedDict, Literal, List, Optional
+from typing import TypedDict, Literal, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
+import httpx
 import json
-import re
 import os
+import shlex
+import signal
 import subprocess
+import threading
 import logging
 
 # Configure logging
@@ -86,10 +91,22 @@ _llm_planner = None
 
 
 def _get_planner_llm():
-    """Get or create the planner LLM instance."""
+    """Get or create the planner LLM instance.
+    
+    The instance owns one process-wide httpx client with keep-alive, so
+    repeated planner calls in a run reuse the TLS connection to OpenAI.
+    """
     global _llm_planner
     if _llm_planner is None:
-        _llm_planner = ChatOpenAI(model="gpt-4o")
+        _llm_planner = ChatOpenAI(
+            model="gpt-4o",
+            max_retries=2,
+            timeout=30,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+                timeout=30,
+            ),
+        )
     return _llm_planner
 
 
@@ -166,16 +183,24 @@ Format as concise markdown."""
             logger.error(f"LLM error in planner: {e}")
             state["summary"] = f"Test failures detected. See logs for details."
         
-        # Update Linear issue with analysis
+        # Update Linear issue with analysis (updates to an existing issue are
+        # sent in the background by the Linear client)
         state = create_or_update_linear_issue(state)
         
-        # Post results to GitHub
+        # Post results to GitHub (including any new Linear link)
         post_ci_results_comment(state)
         
         state["next_action"] = "summarize"
         return state
     
-    # Default behavior: use LLM to decide next action
+    # Nothing has run yet, so the only sensible action is to run the tests;
+    # don't spend an LLM round-trip on a deterministic decision
+    if test_status == "pending":
+        state["next_action"] = "run_tests"
+        state["summary"] = "Starting tests"
+        return state
+    
+    # Otherwise the situation is ambiguous: use LLM to decide next action
     prompt = f"""You are a CI boss agent managing CI/CD workflows.
 
 IMPORTANT: You must analyze the situation and decide the next action.
@@ -199,33 +224,18 @@ You MUST respond with valid JSON: {{"action": "run_tests|analyze_failures|summar
 """
 
     try:
-        llm = _get_planner_llm()
+        # JSON mode makes the model return a single parseable JSON object
+        llm = _get_planner_llm().bind(response_format={"type": "json_object"})
         resp = llm.invoke(prompt)
         content = resp.content if hasattr(resp, 'content') else str(resp)
         
-        # Parse response - try to extract JSON
-        json_match = re.search(r'\{[^{}]*"action"[^{}]*\}', content, re.DOTALL)
-        if json_match:
-            try:
-                parsed = json.loads(json_match.group())
-                action = parsed.get("action", "run_tests")
-                summary = parsed.get("summary", "Proceeding with CI workflow")
-                
-                # Validate action
-                if action not in ("run_tests", "analyze_failures", "summarize"):
-                    action = "run_tests" if test_status == "pending" else "summarize"
-            except json.JSONDecodeError:
-                action = "run_tests" if test_status == "pending" else "summarize"
-                summary = "Proceeding with CI workflow"
-        else:
-            # Fallback parsing
-            if test_status == "pending":
-                action = "run_tests"
-            elif test_status == "failed":
-                action = "analyze_failures"
-            else:
-                action = "summarize"
-            summary = content[:200] if len(content) > 200 else content
+        parsed = json.loads(content)
+        action = parsed.get("action", "run_tests")
+        summary = parsed.get("summary", "Proceeding with CI workflow")
+        
+        # Validate action
+        if action not in ("run_tests", "analyze_failures", "summarize"):
+            action = "run_tests" if test_status == "pending" else "summarize"
             
     except Exception as e:
         logger.error(f"LLM error in planner: {e}")
@@ -249,14 +259,56 @@ You MUST respond with valid JSON: {{"action": "run_tests|analyze_failures|summar
 # Node: GitHub Helper
 # =============================================================================
 
+def _apply_pr_bundle(state: CIState, bundle: dict) -> bool:
+    """
+    Copy a GraphQL PR bundle onto the state.
+    
+    The head commit message is only used when the state's commit SHA is the
+    PR head, a prefix of it, or was unset, since an explicit older SHA has
+    its own message.
+    
+    Args:
+        state: Current CI state, updated in place.
+        bundle: Result of fetch_pr_bundle_graphql.
+        
+    Returns:
+        True if the bundle provided the changed files, False if the REST
+        helpers still need to run.
+    """
+    head_sha = bundle.get("head_sha")
+    if not state.get("commit_sha") and head_sha:
+        state["commit_sha"] = head_sha
+        logger.info(f"Fetched head commit SHA from PR: {head_sha[:8]}")
+    
+    commit_sha = state.get("commit_sha")
+    commit_message = bundle.get("commit_message")
+    if (
+        not state.get("commit_message")
+        and commit_message
+        and head_sha
+        and commit_sha
+        and head_sha.startswith(commit_sha)
+    ):
+        state["commit_message"] = commit_message[:500]  # Truncate if too long
+    
+    changed_files = bundle.get("changed_files")
+    if not changed_files:
+        return False
+    state["changed_files"] = changed_files
+    
+    return True
+
+
 def github_node(state: CIState) -> CIState:
     """
     GitHub helper node - fetch commit/PR metadata and changed files.
     
     This node:
-    - Fetches PR details if pr_number is provided but commit_sha is missing
-    - Fetches changed files from either PR or commit endpoint
-    - Stores commit message if available
+    - For PRs, fetches head SHA, changed files and commit message with a
+      single GraphQL query
+    - Otherwise (or if GraphQL fails), uses the REST endpoints: PR details
+      if commit_sha is missing, changed files from either PR or commit
+      endpoint, and the commit message if available
     
     If GITHUB_TOKEN is not set, logs a warning and returns state unchanged.
     
@@ -268,10 +320,10 @@ def github_node(state: CIState) -> CIState:
     """
     from .github_client import (
         _get_github_token,
+        fetch_pr_bundle_graphql,
         fetch_pr_details,
         fetch_pr_files,
-        fetch_commit_files,
-        fetch_commit_details,
+        fetch_commit,
     )
     
     repo = state.get("repo")
@@ -291,41 +343,86 @@ def github_node(state: CIState) -> CIState:
     
     pr_number = state.get("pr_number")
     commit_sha = state.get("commit_sha")
+    need_message = not state.get("commit_message")
+    # Only a head SHA reported by GitHub may key the PR files cache; a
+    # caller-supplied SHA can be stale or point at an older commit
+    head_sha = None
     
-    # If we have a PR number but no commit SHA, fetch PR to get head commit
-    if pr_number and not commit_sha:
-        pr_details = fetch_pr_details(repo, pr_number, token)
-        if pr_details:
-            commit_sha = pr_details.get("head", {}).get("sha")
-            if commit_sha:
-                state["commit_sha"] = commit_sha
-                logger.info(f"Fetched head commit SHA from PR: {commit_sha[:8]}")
-    
-    # Fetch changed files
-    changed_files = None
-    
+    # For PRs, a single GraphQL query usually returns everything we need
     if pr_number:
-        # Prefer PR endpoint for changed files
-        changed_files = fetch_pr_files(repo, pr_number, token)
-        if changed_files:
-            logger.info(f"Fetched {len(changed_files)} changed files from PR #{pr_number}")
-    
-    if not changed_files and commit_sha:
-        # Fall back to commit endpoint
-        changed_files = fetch_commit_files(repo, commit_sha, token)
+        bundle = fetch_pr_bundle_graphql(repo, pr_number, token)
+        if bundle:
+            head_sha = bundle.get("head_sha")
+        if bundle and _apply_pr_bundle(state, bundle):
+            logger.info(
+                f"Fetched {len(state['changed_files'])} changed files "
+                f"from PR #{pr_number} via GraphQL"
+            )
+            # Only the message can still be missing (an explicit non-head SHA)
+            if need_message and not state.get("commit_message"):
+                commit_data = fetch_commit(repo, state["commit_sha"], token)
+                if commit_data:
+                    commit_message = commit_data.get("commit", {}).get("message", "")
+                    if commit_message:
+                        state["commit_message"] = commit_message[:500]  # Truncate if too long
+            return state
+        # Fall back to REST for whatever GraphQL could not provide
+        commit_sha = state.get("commit_sha")
+    
+    # PR details, PR files and the commit are independent round-trips, so
+    # overlap them on the shared connection pool. Only the commit depends
+    # on a SHA, which may first have to come from the PR. A single commit
+    # GET provides both its changed files and its message.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        pr_files_future = None
+        commit_future = None
+        
+        if pr_number:
+            # Prefer PR endpoint for changed files
+            pr_files_future = executor.submit(
+                fetch_pr_files, repo, pr_number, token, head_sha=head_sha
+            )
+        if commit_sha and (need_message or not pr_number):
+            commit_future = executor.submit(fetch_commit, repo, commit_sha, token)
+        
+        # If we have a PR number but no commit SHA, fetch PR to get head commit
+        if pr_number and not commit_sha:
+            pr_details = fetch_pr_details(repo, pr_number, token)
+            if pr_details:
+                commit_sha = pr_details.get("head", {}).get("sha")
+                if commit_sha:
+                    state["commit_sha"] = commit_sha
+                    logger.info(f"Fetched head commit SHA from PR: {commit_sha[:8]}")
+                    if need_message:
+                        commit_future = executor.submit(fetch_commit, repo, commit_sha, token)
+        
+        # Fetch changed files
+        changed_files = None
+        
+        if pr_files_future:
+            changed_files = pr_files_future.result()
+            if changed_files:
+                logger.info(f"Fetched {len(changed_files)} changed files from PR #{pr_number}")
+        
+        if not changed_files and commit_sha and not commit_future:
+            # Fall back to commit endpoint
+            commit_future = executor.submit(fetch_commit, repo, commit_sha, token)
+        
+        commit_data = commit_future.result() if commit_future else None
+        
+        if not changed_files and commit_data:
+            changed_files = [f["filename"] for f in commit_data.get("files", [])]
+            if changed_files:
+                logger.info(f"Fetched {len(changed_files)} changed files from commit {commit_sha[:8]}")
+        
         if changed_files:
-            logger.info(f"Fetched {len(changed_files)} changed files from commit {commit_sha[:8]}")
-    
-    if changed_files:
-        state["changed_files"] = changed_files
-    elif not state.get("changed_files"):
-        state["changed_files"] = []
-    
-    # Optionally fetch commit message
-    if commit_sha and not state.get("commit_message"):
-        commit_details = fetch_commit_details(repo, commit_sha, token)
-        if commit_details:
-            commit_message = commit_details.get("commit", {}).get("message", "")
+            state["changed_files"] = changed_files
+        elif not state.get("changed_files"):
+            state["changed_files"] = []
+        
+        # Optionally store commit message
+        if need_message and commit_data:
+            commit_message = commit_data.get("commit", {}).get("message", "")
             if commit_message:
                 state["commit_message"] = commit_message[:500]  # Truncate if too long
     
@@ -345,6 +442,107 @@ DEFAULT_PLAYWRIGHT_COMMAND = "npx playwright test"
 DEFAULT_PLAYWRIGHT_TIMEOUT = 1800  # 30 minutes in seconds
 MAX_LOG_LENGTH = 20000  # Maximum characters for test logs
 
+# Test runner configuration, read once at import
+_PLAYWRIGHT_COMMAND = os.environ.get("PLAYWRIGHT_COMMAND", DEFAULT_PLAYWRIGHT_COMMAND)
+_PLAYWRIGHT_WORKING_DIR = os.environ.get("PLAYWRIGHT_WORKING_DIR")
+# Tokenized once as well; an unparsable command is reported when the runner
+# executes rather than breaking the import
+try:
+    _PLAYWRIGHT_ARGS: Optional[List[str]] = shlex.split(_PLAYWRIGHT_COMMAND)
+except ValueError:
+    _PLAYWRIGHT_ARGS = None
+# Output is read in fixed-size chunks and at most this many trailing bytes
+# are kept (enough for MAX_LOG_LENGTH characters of UTF-8), so a single huge
+# or newline-free line cannot grow memory either
+_READ_CHUNK_BYTES = 64 * 1024
+_LOG_TAIL_BYTES = MAX_LOG_LENGTH * 4
+
+
+def _kill_group(process: subprocess.Popen) -> None:
+    """Kill a command started by _run_and_tail and everything it spawned."""
+    # Workers spawned by the command (e.g. Playwright's node processes)
+    # inherit the pipe and would otherwise keep the read loop waiting for EOF
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def _run_and_tail(args: List[str], cwd: Optional[str], timeout: int) -> Tuple[int, str]:
+    """
+    Run a command and keep only the tail of its combined output.
+    
+    stdout and stderr are merged and streamed in fixed-size chunks into a
+    bounded buffer, so memory stays flat no matter how much the test suite
+    prints. The end of the output, where failures are reported, is what is
+    kept. Output is read as raw bytes and only the kept tail is decoded, once.
+    
+    Args:
+        args: Program and arguments to run (no shell is involved).
+        cwd: Working directory, or None for the current one.
+        timeout: Seconds to wait before killing the command and everything
+            it started.
+        
+    Returns:
+        Tuple of (return code, last MAX_LOG_LENGTH characters of output).
+        
+    Raises:
+        subprocess.TimeoutExpired: If the command ran longer than timeout.
+    """
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=cwd,
+        start_new_session=True,
+    )
+    
+    timed_out = threading.Event()
+    
+    def kill():
+        # A command that already exited is not a timeout; only its leftover
+        # descendants still holding the pipe are cleaned up
+        if process.poll() is None:
+            timed_out.set()
+        _kill_group(process)
+    
+    watchdog = threading.Timer(timeout, kill)
+    watchdog.start()
+    
+    tail = bytearray()
+    total_bytes = 0
+    try:
+        for chunk in iter(lambda: process.stdout.read1(_READ_CHUNK_BYTES), b""):
+            tail += chunk
+            total_bytes += len(chunk)
+            if len(tail) > _LOG_TAIL_BYTES:
+                del tail[:-_LOG_TAIL_BYTES]
+        returncode = process.wait()
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            # The read loop raised (e.g. KeyboardInterrupt). The command runs
+            # in its own session, out of reach of the terminal's Ctrl-C, so
+            # kill and reap it here
+            _kill_group(process)
+            process.wait()
+        process.stdout.close()
+    
+    # The exit status must come from the kill itself, not from a watchdog
+    # that fired just after the command exited on its own
+    if timed_out.is_set() and (
+        not hasattr(os, "killpg") or returncode == -signal.SIGKILL
+    ):
+        raise subprocess.TimeoutExpired(args, timeout)
+    
+    logs = tail.decode("utf-8", errors="replace")
+    if total_bytes > len(tail) or len(logs) > MAX_LOG_LENGTH:
+        logs = "... (truncated)\n\n" + logs[-MAX_LOG_LENGTH:]
+    return returncode, logs
+
 
 def test_runner_node(state: CIState) -> CIState:
     """
@@ -353,10 +551,10 @@ def test_runner_node(state: CIState) -> CIState:
     This node:
     - Only runs if next_action == "run_tests"
     - Executes the Playwright command (configurable via env vars)
-    - Captures stdout/stderr and stores in test_logs
+    - Streams combined stdout/stderr and stores the tail in test_logs
     - Sets test_status to "passed" or "failed"
     
-    Environment Variables:
+    Environment Variables (read once at import):
         PLAYWRIGHT_COMMAND: Command to run (default: "npx playwright test")
         PLAYWRIGHT_WORKING_DIR: Working directory for test execution
     
@@ -373,45 +571,34 @@ def test_runner_node(state: CIState) -> CIState:
         logger.info(f"Skipping test execution (next_action={next_action})")
         return state
     
-    # Get configuration from environment
-    command = os.environ.get("PLAYWRIGHT_COMMAND", DEFAULT_PLAYWRIGHT_COMMAND)
-    working_dir = os.environ.get("PLAYWRIGHT_WORKING_DIR")
+    command = _PLAYWRIGHT_COMMAND
+    working_dir = _PLAYWRIGHT_WORKING_DIR
     
     logger.info(f"Running Playwright tests: {command}")
     if working_dir:
         logger.info(f"Working directory: {working_dir}")
     
     try:
-        # Run the test command
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=DEFAULT_PLAYWRIGHT_TIMEOUT,
+        if _PLAYWRIGHT_ARGS is None:
+            raise ValueError(f"could not parse PLAYWRIGHT_COMMAND {command!r}")
+        
+        # Run the test command directly (no intermediate shell), keeping
+        # only the tail of its output
+        returncode, logs = _run_and_tail(
+            _PLAYWRIGHT_ARGS,
             cwd=working_dir if working_dir else None,
+            timeout=DEFAULT_PLAYWRIGHT_TIMEOUT,
         )
         
-        # Combine stdout and stderr
-        logs = ""
-        if result.stdout:
-            logs += result.stdout
-        if result.stderr:
-            logs += "\n--- STDERR ---\n" + result.stderr
-        
-        # Truncate logs if too long
-        if len(logs) > MAX_LOG_LENGTH:
-            logs = logs[:MAX_LOG_LENGTH] + "\n\n... (truncated)"
-        
         state["test_logs"] = logs
         
         # Determine status based on return code
-        if result.returncode == 0:
+        if returncode == 0:
             state["test_status"] = "passed"
             logger.info("Playwright tests passed")
         else:
             state["test_status"] = "failed"
-            logger.warning(f"Playwright tests failed (exit code: {result.returncode})")
+            logger.warning(f"Playwright tests failed (exit code: {returncode})")
             
     except subprocess.TimeoutExpired:
         state["test_status"] = "failed"
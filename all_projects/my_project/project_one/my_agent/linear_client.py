@@ -13,10 +13,24 @@ Environment Variables:
 """
 
 import os
+import json
+import time
+import atexit
 import logging
-from typing import Optional, List, Dict, Any, TYPE_CHECKING
+import threading
+from concurrent.futures import Future, wait
+from functools import lru_cache
+from itertools import islice
+from typing import Optional, List, Dict, Any, Tuple, TYPE_CHECKING
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # Optional: faster encoding of large issue descriptions
+    import orjson
+except ImportError:
+    orjson = None
 
 if TYPE_CHECKING:
     from .graph import CIState
@@ -29,10 +43,103 @@ LINEAR_API_URL = "https://api.linear.app/graphql"
 # Maximum description length for Linear issues
 MAX_DESCRIPTION_LENGTH = 10000
 
+# Characters of log output kept in failure comments; the end of a run's
+# output is where the failing assertions are, so the tail is kept.
+_LOG_TAIL_BYTES = 4000
+
+# Request/response (de)serializers; both work on bytes
+if orjson:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    _loads = json.loads
+
+# Shared keep-alive session: a create/update flow makes several GraphQL calls
+# back-to-back, so reusing one TLS connection to api.linear.app saves a
+# handshake on each of them.
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504],
+        ),
+    ),
+)
+
+# Workflow states per team as (fetched_at, {lowercase name: state id}).
+# States rarely change, so a short TTL spares the lookup on repeat updates.
+_STATE_CACHE: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_STATE_CACHE_TTL = 240
+
+# Comments and state changes on existing issues feed nothing back into the
+# graph, so they run in the background while the graph moves on. The worker
+# threads are daemons, so interpreter exit does not wait on them; instead the
+# exit hook gives pending calls a bounded grace period to finish.
+_PENDING: List[Future] = []
+_PENDING_LOCK = threading.Lock()
+_PENDING_EXIT_TIMEOUT = 10
+_MAX_CONCURRENT_CALLS = threading.BoundedSemaphore(4)
+
+
+def _submit(fn, *args) -> Future:
+    """Run a Linear call on a background daemon thread and track it."""
+    future: Future = Future()
+    
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with _MAX_CONCURRENT_CALLS:
+                future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    with _PENDING_LOCK:
+        _PENDING[:] = [f for f in _PENDING if not f.done()]
+        _PENDING.append(future)
+    threading.Thread(target=run, name="linear", daemon=True).start()
+    return future
+
+
+def wait_for_pending(timeout: Optional[float] = None) -> bool:
+    """Block until background Linear calls have finished.
+    
+    Args:
+        timeout: Maximum seconds to wait, or None to wait indefinitely.
+        
+    Returns:
+        True if every pending call completed, False on timeout.
+    """
+    with _PENDING_LOCK:
+        pending = list(_PENDING)
+    _, not_done = wait(pending, timeout=timeout)
+    return not not_done
+
+
+def _shutdown() -> None:
+    """Let pending Linear calls finish, then close the session."""
+    wait_for_pending(_PENDING_EXIT_TIMEOUT)
+    _SESSION.close()
+
 
+atexit.register(_shutdown)
+
+
+@lru_cache(maxsize=1)
 def _get_linear_config() -> tuple[Optional[str], Optional[str]]:
     """Get Linear configuration from environment.
     
+    The environment is read (and warnings logged) once per process; call
+    _get_linear_config.cache_clear() after changing the Linear env vars.
+    
     Returns:
         Tuple of (api_key, team_id). Either or both may be None.
     """
@@ -88,20 +195,19 @@ def _execute_graphql(
         Response data or None if request fails.
     """
     headers = {
-        "Content-Type": "application/json",
         "Authorization": api_key,  # Linear uses the key directly
     }
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             LINEAR_API_URL,
             headers=headers,
-            json={"query": query, "variables": variables},
+            data=_dumps({"query": query, "variables": variables}),
             timeout=30
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = _loads(response.content)
             if "errors" in data:
                 logger.error(f"Linear GraphQL errors: {data['errors']}")
                 return None
@@ -116,6 +222,9 @@ def _execute_graphql(
     except requests.RequestException as e:
         logger.error(f"Request error calling Linear API: {e}")
         return None
+    except ValueError as e:
+        logger.error(f"Invalid JSON from Linear API: {e}")
+        return None
 
 
 def _build_issue_description(state: "CIState") -> str:
@@ -155,11 +264,14 @@ def _build_issue_description(state: "CIState") -> str:
             f"### Changed Files ({len(changed_files)} total)",
         ])
         # Show up to 20 files
-        for f in changed_files[:20]:
-            lines.append(f"- `{f}`")
+        lines.extend(f"- `{f}`" for f in islice(changed_files, 20))
         if len(changed_files) > 20:
             lines.append(f"- ... and {len(changed_files) - 20} more files")
     
+    # Running length of "\n".join(lines), kept so the description is only
+    # joined once
+    used = sum(map(len, lines)) + len(lines) - 1
+    
     # Add test logs (truncated)
     test_logs = state.get("test_logs")
     if test_logs:
@@ -168,18 +280,21 @@ def _build_issue_description(state: "CIState") -> str:
             "### Test Logs",
             "```",
         ])
+        used += len("\n\n### Test Logs\n```")
         # Reserve space for the rest of the description
-        max_logs = MAX_DESCRIPTION_LENGTH - len("\n".join(lines)) - 500
-        truncated_logs = test_logs[:max(max_logs, 1000)]
-        if len(test_logs) > max_logs:
-            truncated_logs += "\n... (truncated)"
+        max_logs = MAX_DESCRIPTION_LENGTH - used - 500
+        if len(test_logs) <= max_logs:
+            truncated_logs = test_logs
+        else:
+            truncated_logs = "... (head truncated)\n" + test_logs[-max(max_logs, 1000):]
         lines.append(truncated_logs)
         lines.append("```")
+        used += len(truncated_logs) + len("\n\n```")
     
     description = "\n".join(lines)
     
     # Ensure we don't exceed max length
-    if len(description) > MAX_DESCRIPTION_LENGTH:
+    if used > MAX_DESCRIPTION_LENGTH:
         description = description[:MAX_DESCRIPTION_LENGTH - 20] + "\n\n... (truncated)"
     
     return description
@@ -195,8 +310,8 @@ def _build_issue_title(state: "CIState") -> str:
         Issue title.
     """
     repo = state.get("repo", "unknown")
-    commit_sha = state.get("commit_sha", "unknown")
-    short_sha = commit_sha[:7] if len(commit_sha) >= 7 else commit_sha
+    # Slicing already copes with SHAs shorter than 7 characters
+    short_sha = state.get("commit_sha", "unknown")[:7]
     
     return f"[CI] Playwright failure on {repo}@{short_sha}"
 
@@ -296,6 +411,58 @@ def add_comment_to_issue(issue_id: str, body: str) -> bool:
         return False
 
 
+def _get_workflow_state_id(
+    team_id: str,
+    state_name: str,
+    api_key: str,
+    ttl: float = _STATE_CACHE_TTL
+) -> Optional[str]:
+    """Look up a team's workflow state ID by name (case-insensitive).
+    
+    The team's states are cached for ``ttl`` seconds.
+    
+    Args:
+        team_id: Linear team ID.
+        state_name: Workflow state name (e.g., "Done").
+        api_key: Linear API key.
+        ttl: How long a cached state list stays valid, in seconds.
+        
+    Returns:
+        Workflow state ID, or None if it could not be found.
+    """
+    cached = _STATE_CACHE.get(team_id)
+    if cached and time.monotonic() - cached[0] < ttl:
+        states = cached[1]
+    else:
+        state_query = """
+        query GetWorkflowStates($teamId: String!) {
+            team(id: $teamId) {
+                states {
+                    nodes {
+                        id
+                        name
+                    }
+                }
+            }
+        }
+        """
+        
+        result = _execute_graphql(state_query, {"teamId": team_id}, api_key)
+        
+        if not result or not result.get("team"):
+            logger.error("Failed to fetch workflow states")
+            return None
+        
+        nodes = result["team"]["states"]["nodes"]
+        states = {s["name"].lower(): s["id"] for s in nodes}
+        _STATE_CACHE[team_id] = (time.monotonic(), states)
+    
+    state_id = states.get(state_name.lower())
+    if not state_id:
+        logger.warning(f"Workflow state '{state_name}' not found")
+    return state_id
+
+
 def update_issue_state(issue_id: str, state_name: str = "Done") -> bool:
     """Update the workflow state of a Linear issue.
     
@@ -313,34 +480,10 @@ def update_issue_state(issue_id: str, state_name: str = "Done") -> bool:
     if not api_key or not team_id:
         return False
     
-    # First, find the workflow state ID
-    state_query = """
-    query GetWorkflowStates($teamId: String!) {
-        team(id: $teamId) {
-            states {
-                nodes {
-                    id
-                    name
-                }
-            }
-        }
-    }
-    """
-    
-    result = _execute_graphql(state_query, {"teamId": team_id}, api_key)
-    
-    if not result or not result.get("team"):
-        logger.error("Failed to fetch workflow states")
-        return False
-    
-    states = result["team"]["states"]["nodes"]
-    target_state = next((s for s in states if s["name"].lower() == state_name.lower()), None)
-    
-    if not target_state:
-        logger.warning(f"Workflow state '{state_name}' not found")
+    state_id = _get_workflow_state_id(team_id, state_name, api_key)
+    if not state_id:
         return False
     
-    # Update the issue
     mutation = """
     mutation UpdateIssue($id: String!, $input: IssueUpdateInput!) {
         issueUpdate(id: $id, input: $input) {
@@ -351,7 +494,7 @@ def update_issue_state(issue_id: str, state_name: str = "Done") -> bool:
     
     variables = {
         "id": issue_id,
-        "input": {"stateId": target_state["id"]}
+        "input": {"stateId": state_id}
     }
     
     result = _execute_graphql(mutation, variables, api_key)
@@ -364,14 +507,79 @@ def update_issue_state(issue_id: str, state_name: str = "Done") -> bool:
         return False
 
 
+def add_comment_and_update_state(
+    issue_id: str,
+    body: str,
+    state_name: str = "Done"
+) -> bool:
+    """Comment on a Linear issue and move it to a new state in one request.
+    
+    Both mutations are sent as a single aliased GraphQL document. If the
+    target state cannot be found, only the comment is added.
+    
+    Args:
+        issue_id: Linear issue ID.
+        body: Comment body (markdown supported).
+        state_name: Target state name (e.g., "Done").
+        
+    Returns:
+        True if both the comment and the state update succeeded.
+    """
+    api_key, team_id = _get_linear_config()
+    if not api_key or not team_id:
+        return False
+    
+    state_id = _get_workflow_state_id(team_id, state_name, api_key)
+    if not state_id:
+        add_comment_to_issue(issue_id, body)
+        return False
+    
+    mutation = """
+    mutation CommentAndUpdate(
+        $comment: CommentCreateInput!,
+        $id: String!,
+        $input: IssueUpdateInput!
+    ) {
+        c: commentCreate(input: $comment) {
+            success
+        }
+        u: issueUpdate(id: $id, input: $input) {
+            success
+        }
+    }
+    """
+    
+    variables = {
+        "comment": {"issueId": issue_id, "body": body},
+        "id": issue_id,
+        "input": {"stateId": state_id},
+    }
+    
+    result = _execute_graphql(mutation, variables, api_key) or {}
+    commented = bool((result.get("c") or {}).get("success"))
+    updated = bool((result.get("u") or {}).get("success"))
+    
+    if commented and updated:
+        logger.info(
+            f"Added comment to Linear issue {issue_id} and moved it to '{state_name}'"
+        )
+    else:
+        logger.error(
+            f"Failed to update Linear issue {issue_id} "
+            f"(comment: {commented}, state: {updated})"
+        )
+    return commented and updated
+
+
 def create_or_update_linear_issue(state: "CIState") -> "CIState":
     """Create or update a Linear issue for the current CI state.
     
     Behavior:
       - If LINEAR_API_KEY or LINEAR_TEAM_ID are missing, log and return state unchanged.
-      - If state["linear_issue_id"] is already set:
+      - If state["linear_issue_id"] is already set (runs in the background;
+        see wait_for_pending):
           - Append a comment to that issue describing the latest test run.
-          - Optionally update workflow state if tests passed.
+          - If tests passed, also move the issue to Done (same request).
       - Else:
           - Create a new issue with:
               title: e.g. "[CI] Playwright failure on {repo}@{short_sha}"
@@ -401,16 +609,16 @@ def create_or_update_linear_issue(state: "CIState") -> "CIState":
                 f"**Commit:** `{state.get('commit_sha', 'N/A')}`\n\n"
                 "The tests that previously failed are now passing."
             )
-            add_comment_to_issue(existing_issue_id, comment)
-            # Optionally move to Done state
-            update_issue_state(existing_issue_id, "Done")
+            # Comment and move to Done in a single background request
+            _submit(add_comment_and_update_state, existing_issue_id, comment, "Done")
         elif test_status == "failed":
             # Add a comment with the latest failure
             summary = state.get("summary", "No summary available")
             test_logs = state.get("test_logs", "")
-            truncated_logs = test_logs[:2000] if test_logs else ""
-            if len(test_logs) > 2000:
-                truncated_logs += "\n... (truncated)"
+            if len(test_logs) > _LOG_TAIL_BYTES:
+                truncated_logs = "... (head truncated)\n" + test_logs[-_LOG_TAIL_BYTES:]
+            else:
+                truncated_logs = test_logs
             
             comment = (
                 "## ❌ Test Failure Update\n\n"
@@ -418,7 +626,7 @@ def create_or_update_linear_issue(state: "CIState") -> "CIState":
                 f"### Summary\n{summary}\n\n"
                 "### Test Logs\n```\n" + truncated_logs + "\n```"
             )
-            add_comment_to_issue(existing_issue_id, comment)
+            _submit(add_comment_to_issue, existing_issue_id, comment)
     else:
         # Create new issue only if tests failed
         if test_status == "failed":
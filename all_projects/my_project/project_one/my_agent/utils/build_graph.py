@@ -1,11 +1,15 @@
-from typing import TypedDict, Annotated, Sequence, Literal
+from typing import TypedDict, Annotated, Sequence, Literal, get_args
 
+import logging
+import threading
 from functools import lru_cache
 from langchain_core.messages import BaseMessage
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, END, add_messages
 
+logger = logging.getLogger(__name__)
+
 
 @lru_cache(maxsize=1)
 def _get_tools():
@@ -49,23 +53,28 @@ system_prompt = """Be a helpful assistant.
 
 IMPORTANT: Always maintain documentation up to date. When you make changes to code, workflows, dependencies, or functionality, you must update the relevant documentation files (README.md, code comments, docstrings) to reflect those changes. Documentation should accurately describe what the code does, what environment variables are needed, and how to use the system."""
 
+_SYSTEM_MSG = {"role": "system", "content": system_prompt}
+
 
 # Define the function that calls the model
 def call_model(state, config):
-    messages = state["messages"]
-    messages = [{"role": "system", "content": system_prompt}] + messages
     model_name = config.get('configurable', {}).get("model_name", "gpt-4o")
     model = _get_model(model_name)
-    response = model.invoke(messages)
+    response = model.invoke((_SYSTEM_MSG, *state["messages"]))
     # We return a list, because this will get added to the existing list
     return {"messages": [response]}
 
 
+@lru_cache(maxsize=1)
+def _get_tool_node():
+    """Build the ToolNode once; it parses tool schemas on construction."""
+    return ToolNode(_get_tools())
+
+
 # Define the function to execute tools - wrapped to enable lazy initialization
 def action_node(state):
     """Execute tools with lazy initialization."""
-    tool_node = ToolNode(_get_tools())
-    return tool_node.invoke(state)
+    return _get_tool_node().invoke(state)
 
 
 # Define the config
@@ -73,6 +82,19 @@ class GraphConfig(TypedDict):
     model_name: Literal["gpt-4o", "gpt-4o-mini","gpt-3.5-turbo"]
 
 
+def _warm_up():
+    """Populate the model and tool caches ahead of the first agent turn."""
+    for model_name in get_args(GraphConfig.__annotations__["model_name"]):
+        try:
+            _get_model(model_name)
+        except Exception as e:  # e.g. missing API keys; the real call will report it
+            logger.debug(f"Skipping warm-up of {model_name}: {e}")
+    try:
+        _get_tool_node()
+    except Exception as e:
+        logger.debug(f"Skipping warm-up of tools: {e}")
+
+
 @lru_cache(maxsize=1)
 def _build_workflow():
     """Build the workflow graph lazily."""
@@ -111,19 +133,21 @@ def _build_workflow():
     # We now add a normal edge from `tools` to `agent`.
     # This means that after `tools` is called, `agent` node is called next.
     workflow.add_edge("action", "agent")
+
+    # Construct models and tools in the background so the first turn finds
+    # them already cached
+    threading.Thread(target=_warm_up, name="agent-warmup", daemon=True).start()
     
     return workflow
 
 
-class _LazyWorkflow:
-    """Lazy wrapper that builds the workflow on first access."""
-    
-    def __getattr__(self, name):
-        return getattr(_build_workflow(), name)
-    
-    def compile(self, *args, **kwargs):
-        return _build_workflow().compile(*args, **kwargs)
-
+def __getattr__(name):
+    """Build `workflow` on first access (PEP 562).
 
-# Export a lazy workflow object that only builds when accessed
-workflow = _LazyWorkflow()
+    The built graph is stored as a real module attribute, so later lookups
+    skip this hook entirely.
+    """
+    if name == "workflow":
+        globals()["workflow"] = _build_workflow()
+        return globals()["workflow"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
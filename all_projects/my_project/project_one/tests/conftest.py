@@ -0,0 +1,67 @@
+"""
+Shared pytest fixtures for the CI Boss tests.
+
+Canned GitHub API data is built once per session and handed out as
+read-only views (MappingProxyType / tuples), so tests can share it without
+copying and cannot mutate it by accident.
+"""
+
+from types import MappingProxyType
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture(scope="class")
+def fake_github_token():
+    """Serve a fake GitHub token to every test in the requesting class."""
+    with patch(
+        "my_agent.github_client._get_github_token", return_value="fake-token"
+    ):
+        yield "fake-token"
+
+
+@pytest.fixture(scope="session")
+def gh_base_state():
+    """CI state for a PR whose head commit is not yet known."""
+    return MappingProxyType({
+        "repo": "testowner/testrepo",
+        "commit_sha": None,
+        "pr_number": 42,
+        "changed_files": (),
+        "test_status": "pending",
+    })
+
+
+@pytest.fixture(scope="session")
+def gh_pr_files():
+    """Files changed by the PR."""
+    return ("src/main.py", "tests/test_main.py")
+
+
+@pytest.fixture(scope="session")
+def gh_pr_details():
+    """Response of GET /repos/{repo}/pulls/{number}."""
+    return MappingProxyType({
+        "head": MappingProxyType({"sha": "abc123def456"}),
+        "title": "Test PR",
+    })
+
+
+@pytest.fixture(scope="session")
+def gh_commit():
+    """Response of GET /repos/{repo}/commits/{sha} for the PR head."""
+    return MappingProxyType({
+        "commit": MappingProxyType({"message": "Fix bug in main"}),
+        "files": (MappingProxyType({"filename": "src/main.py"}),),
+    })
+
+
+@pytest.fixture(scope="session")
+def gh_pr_bundle(gh_pr_files):
+    """Result of fetch_pr_bundle_graphql for the same PR."""
+    return MappingProxyType({
+        "head_sha": "abc123def456",
+        "changed_files": gh_pr_files,
+        "commit_message": "Fix bug in main",
+    })
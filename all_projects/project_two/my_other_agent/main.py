@@ -22,6 +22,7 @@ Example Usage:
 """
 
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 # Fix for imports when module is loaded directly by LangGraph
@@ -31,11 +32,26 @@ _file = Path(__file__).resolve()
 _parent = _file.parent  # my_other_agent directory
 _grandparent = _parent.parent  # project_two directory
 
-# Add grandparent to path so 'my_other_agent' package can be imported
-if str(_grandparent) not in sys.path:
-    sys.path.insert(0, str(_grandparent))
+
+def _ensure_path():
+    """Add project_two to sys.path (once) so 'my_other_agent' can be imported."""
+    grandparent = str(_grandparent)
+    if grandparent not in sys.path:
+        sys.path.insert(0, grandparent)
+
+
+_ensure_path()
 
 # Use absolute import - this works when project_two is in sys.path
 from my_other_agent.utils.build_graph import workflow
 
-graph = workflow.compile()
\ No newline at end of file
+
+@lru_cache(maxsize=1)
+def get_graph():
+    """Compile the workflow once and return the shared compiled graph."""
+    return workflow.compile()
+
+
+# LangGraph loads the entry point (main.py:graph) from the module namespace,
+# so the compiled graph must be a real module attribute
+graph = get_graph()